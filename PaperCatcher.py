@@ -2,8 +2,13 @@ from langchain_community.retrievers import ArxivRetriever # type: ignore
 from langchain.schema import Document  # type: ignore
 from typing import List
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import argparse
+import hashlib
 import os
+import pickle
+import re
+import time
 from init import get_config # type: ignore
 
 config = get_config()
@@ -13,7 +18,42 @@ DEFAULT_KEYWORD = config.DEFAULT_KEYWORD   # 默认检索关键词
 DEFAULT_SEARCH_COUNT = config.DEFAULT_SEARCH_COUNT   # 默认检索返回论文数量
 SEARCH_DIR = config.SEARCH_DIR   # 论文检索结果保存目录
 LOAD_MAX_DOCS = config.LOAD_MAX_DOCS
+SEARCH_CACHE_TTL = config.SEARCH_CACHE_TTL   # 检索结果缓存有效期（秒）
+SEARCH_CACHE_DIR = os.path.join(SEARCH_DIR, ".cache")   # 检索结果缓存目录
+SAVE_WORKERS = 8   # 并行写入论文文件的线程数
 
+_RE_TITLE_ILLEGAL = re.compile(r'[^\w .\-]')   # 文件名中不允许出现的字符（仅保留字母数字、空格及._-）
+
+
+def search_cache_path(keyword: str, n: int, load_max_docs: int, get_full_document: bool) -> str:
+    """根据检索参数生成缓存文件路径"""
+    key = hashlib.blake2b(
+        repr((keyword, n, load_max_docs, get_full_document)).encode(),
+        digest_size=16
+    ).hexdigest()
+    return os.path.join(SEARCH_CACHE_DIR, f"{key}.pkl")
+
+def load_search_cache(cache_path: str):
+    """读取未过期的检索缓存，过期则删除；无可用缓存时返回None"""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        if os.path.getmtime(cache_path) > time.time() - SEARCH_CACHE_TTL:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        os.remove(cache_path)
+    except Exception as e:
+        print(f"读取检索缓存失败: {str(e)}")
+    return None
+
+def save_search_cache(cache_path: str, results: List[Document]) -> None:
+    """将检索结果写入本地缓存"""
+    try:
+        os.makedirs(SEARCH_CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(results, f)
+    except Exception as e:
+        print(f"写入检索缓存失败: {str(e)}")
 
 def query_academic_papers(
     keyword: str,
@@ -38,6 +78,13 @@ def query_academic_papers(
     #         entry_id = paper.metadata.get("Entry ID")
     #         entry_ids_dict["Entry_ID"] = entry_id
 
+    # 优先使用本地缓存（arXiv每日更新一次，有效期内无需重复请求）
+    cache_path = search_cache_path(keyword, n, load_max_docs, get_full_document)
+    cached = load_search_cache(cache_path)
+    if cached is not None:
+        print(f"使用本地检索缓存: {cache_path}")
+        return cached
+
     # 初始化检索器
     retriever = ArxivRetriever(
         load_max_docs=load_max_docs,
@@ -54,6 +101,9 @@ def query_academic_papers(
         # if get_full_document == True:
         #     for result in results:
         #         result["Entry_ID"] = entry_ids_dict["Entry_ID"]
+
+        if results:
+            save_search_cache(cache_path, results)
         
         return results
     
@@ -70,7 +120,7 @@ def save_paper_content(paper: Document, output_dir: str) -> None:
     
     # 提取论文题目，用于文件名（去除非法字符）
     title = paper.metadata.get('Title', 'Untitled').strip()
-    title = "".join([c for c in title if c.isalnum() or c in (' ', '.', '_', '-')]).replace(' ', '_')
+    title = _RE_TITLE_ILLEGAL.sub('', title).replace(' ', '_')
         
     fileurl = paper.metadata.get('Entry ID')
     
@@ -104,8 +154,9 @@ def main():
         print("未检索到有效论文结果")
         return
     
-    for i, paper in enumerate(papers, 1):
-        save_paper_content(paper, SEARCH_DIR)
+    # 各论文文件相互独立，并行写入
+    with ThreadPoolExecutor(max_workers=SAVE_WORKERS) as executor:
+        list(executor.map(lambda paper: save_paper_content(paper, SEARCH_DIR), papers))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
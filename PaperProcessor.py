@@ -1,192 +1,93 @@
 import argparse
+import asyncio
+import atexit
+import gc
+import io
 import os
 import re
+import sqlite3
 import time
-import hashlib #哈希去重
-import requests # type: ignore
+from hashlib import blake2b #哈希去重
+from collections import deque
+import aiohttp # type: ignore
+import orjson # type: ignore
 import pdfplumber # type: ignore
-from typing import List, Tuple
+import pymupdf # type: ignore
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from urllib.parse import urlparse
-from requests.adapters import HTTPAdapter # type: ignore
-from urllib3.util.retry import Retry # type: ignore
 from init import get_config # type: ignore
-from nltk.tokenize import sent_tokenize # type: ignore
 
 config = get_config()
 
 # 使用配置参数
 PDF_DIR = config.PDF_DIR  # PDF 文件保存目录
+CACHE_PDF = config.CACHE_PDF  # 是否将下载的PDF写入缓存目录
 RESULT_DIR = config.RESULT_DIR  # 分析结果保存目录
 SEARCH_DIR = config.SEARCH_DIR  # 论文检索结果保存目录
 Path = config.Path  #输入目录路径（包含论文链接文件）
 Timeout = config.TIMEOUT  #超时时间
+MAX_WORKERS = config.MAX_WORKERS  # 并行解析PDF的最大进程数
 
 MAX_RETRIES = config.MAX_RETRIES # 最大重试次数
 BACKOFF_FACTOR = config.BACKOFF_FACTOR # 超时回退系数
+MAX_CONCURRENCY = config.MAX_CONCURRENCY  # 模型API最大并发请求数
+RATE_LIMIT = config.RATE_LIMIT  # 每秒最多发起的模型API请求数
+BATCH_CHUNKS = config.BATCH_CHUNKS  # 合并为一次模型请求的分块数
+DOWNLOAD_CONCURRENCY = config.DOWNLOAD_CONCURRENCY  # 对arXiv的最大并发下载连接数
+SHOW_PROGRESS = config.SHOW_PROGRESS  # 是否显示下载进度
+PAPER_CONCURRENCY = config.PAPER_CONCURRENCY  # 同时处理的论文数
 MAX_PDF_PAGES = config.MAX_PDF_PAGES  # 最大解析页数
 CHUNK_SIZE = config.CHUNK_SIZE   # 文本分块长度
+MAX_CHUNKS = config.MAX_CHUNKS  # 每篇论文解析的文本上限（按分块数计）
 
 API_KEY = config.API_KEY  # API 密钥
 API_URL = config.API_URL  # API 地址
 MODEL_ID = config.MODEL_ID  # 模型 ID
 
-
-
-def setup_requests_session():
-    """配置带重试机制的请求会话"""
-    session = requests.Session()
-    retry = Retry(
-        total=MAX_RETRIES,
-        backoff_factor=BACKOFF_FACTOR,
-        status_forcelist=[502, 503, 504]
+RETRY_STATUS = {502, 503, 504}  # 需要重试的响应状态码
+ARXIV_HOSTS = {"arxiv.org", "www.arxiv.org", "export.arxiv.org"}  # 可处理的论文链接域名
+BACKOFF_MAX = 120  # 单次重试等待上限（秒）
+DOWNLOAD_CHUNK_BYTES = 64 * 1024  # 下载时每次读取的字节数
+PROGRESS_INTERVAL = 1.0  # 下载进度的最短输出间隔（秒）
+API_KEEPALIVE_TIMEOUT = 120  # API空闲连接保活时长（秒），跨越分块与汇总请求之间的等待
+DEDUPE_WINDOW = 64  # 重复页面检测的滑动窗口大小（页）
+PROMPT_VERSION = 2  # 分块提示词版本，修改提示词后递增以使旧的缓存结果失效
+LLM_CACHE_PATH = os.path.join(RESULT_DIR, ".llm_cache.db")  # 分块分析结果的持久化缓存
+
+# 预编译正则表达式
+_RE_ARXIV_ID = re.compile(r"arxiv\.org/(abs|pdf)/([\d\.v]+)")  # arXiv链接中的论文ID
+_RE_CLEAN = re.compile(r'''
+    (?P<upper>\b[A-Z]\s(?=[A-Z]\b))      # 被拆开的大写单词
+    |(?P<hyph>\d\s*-\s*\d)               # 数字连字符
+    |(?P<brkt>\s+[\(\{\[\]\}\)])         # 括号前的多余空白
+    |(?P<alphadig>[A-Za-z]\s+(?=\d))     # 字母与数字间的多余空白
+    |(?P<ws>\s{2,})                      # 连续空白
+''', re.X)  # 文本清洗（单次扫描完成全部替换）
+_RE_BATCH_ITEM = re.compile(r'<chunk (\d+)>(.*?)</chunk \1>', re.S)  # 批量分析结果中各分块的分析
+_RE_SECTION = re.compile(r'''
+    ^\s*                # 起始空白
+    (?:                 
+        \d+             # 数字编号
+        [\.\s]+         # 分隔符
+        [A-Z]{3,}       # 大写标题单词
+    |  
+        [A-Z]{3,}       # 纯大写标题
     )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount('https://', adapter)
-    return session
-
-def extract_arxiv_id(url: str) -> str:
-    """从arXiv URL提取论文ID（兼容版本号）"""
-    pattern = r"arxiv\.org/(abs|pdf)/([\d\.v]+)"
-    match = re.search(pattern, url)
-    if not match:
-        raise ValueError(f"无效的arXiv链接: {url}")
-    return match.group(2).split('.pdf')[0]
-
-def download_pdf(url: str, save_path: str) -> bool:
-    """下载PDF文件到指定路径（带进度显示）"""
-    try:
-        response = requests.get(url, stream=True, timeout=Timeout)
-        response.raise_for_status()
-        
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
-        
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(1024*1024):
-                f.write(chunk)
-                downloaded += len(chunk)
-                if total_size > 0:
-                    progress = downloaded / total_size * 100
-                    print(f"\r原始PDF文件下载进度: {progress:.1f}%", end='')
-        print()
-        return True
-    except Exception as e:
-        print(f"\n下载失败 {url}: {str(e)}")
-        return False
-
-def detect_section_change(page) -> bool:
-    """检测章节标题变化"""
-    # 基于字体特征检测标题（示例实现）
-    large_fonts = [char["size"] for char in page.chars if char["size"] > 14]
-    if len(large_fonts) > 3:
-        return True
-    # 基于关键词检测
-    text = page.extract_text()
-    if re.search(r'\b(Abstract|Introduction|Method|References)\b', text):
-        return True
-    return False
-
-def detect_section_change(page, content) -> bool:
-    """增强章节检测逻辑"""
-    # 基于字体特征检测
-    large_chars = [c for c in page.chars if c["size"] > 14]
-    if len(large_chars) > 5 and any(c["text"].isupper() for c in large_chars):
-        return True
-    
-    # 基于内容模式检测
-    section_pattern = r'''
-        ^\s*                # 起始空白
-        (?:                 
-            \d+             # 数字编号
-            [\.\s]+         # 分隔符
-            [A-Z]{3,}       # 大写标题单词
-        |  
-            [A-Z]{3,}       # 纯大写标题
-        )
-        \b
-    '''
-    return re.search(section_pattern, content, re.X) is not None
-
-def extract_pdf_text(pdf_path: str) -> List[str]:
-    """分块提取PDF文本"""
-    chunks = []
-    current_chunk = []
-    current_length = 0
-    processed_hashes = set()  # 新增重复内容检测
-    
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for i, page in enumerate(pdf.pages[:MAX_PDF_PAGES]):
-                # 增强布局参数配置
-                text = page.filter(
-                    lambda obj: obj["object_type"] == "char" and obj["size"] > 8
-                ).extract_text(
-                    layout=True,
-                    x_tolerance=2,
-                    y_tolerance=3,
-                    keep_blank_chars=False
-                ) or ""
-
-                # 增强型文本清洗管道
-                clean_content = re.sub(r'(?<=\b)([A-Z])\s(?=[A-Z]\b)', r'\1', text)  # 修复大写单词分割
-                clean_content = re.sub(r'(\d)\s*-\s*(\d)', r'\1-\2', clean_content)  # 保留数字连字符
-                clean_content = re.sub(r'\s([\(\{\[\]\}\)])', r'\1', clean_content)  # 修复括号粘连
-                clean_content = re.sub(r'([A-Za-z])\s+(?=\d)', r'\1', clean_content)  # 修复字母数字粘连
-                clean_content = re.sub(r'\s{2,}', ' ', clean_content).strip()
-
-                # 新增重复内容检测
-                content_hash = hashlib.md5(clean_content.encode()).hexdigest()
-                if content_hash in processed_hashes:
-                    continue
-                processed_hashes.add(content_hash)
-
-                # 增强章节检测
-                if detect_section_change(page, clean_content):
-                    if current_chunk:
-                        chunks.append(' '.join(current_chunk))
-                        current_chunk = []
-                        current_length = 0
-                    chunks.append(clean_content)  # 章节标题独立分块
-                    continue
+    \b
+''', re.X)  # 章节标题
 
-                # 智能分块逻辑
-                sentences = sent_tokenize(clean_content)
-                for sent in sentences:
-                    words = re.findall(r'\b\w+[\-/]?\w*\b|[\(\)\{\}\[\]]', sent)  # 增强单词分割
-                    
-                    for word in words:
-                        estimated_length = current_length + len(word) + 1
-                        
-                        # 动态分块策略（允许±15%浮动）
-                        if estimated_length > CHUNK_SIZE * 1.15:
-                            if len(current_chunk) > CHUNK_SIZE * 0.3:
-                                chunks.append(' '.join(current_chunk))
-                                current_chunk = [word]
-                                current_length = len(word)
-                            else:
-                                current_chunk.append(word)
-                                current_length += len(word) + 1
-                        else:
-                            current_chunk.append(word)
-                            current_length += len(word) + 1
-
-                    # 句子完整性保护
-                    if current_chunk and current_length > CHUNK_SIZE * 0.8:
-                        chunks.append(' '.join(current_chunk))
-                        current_chunk = []
-                        current_length = 0
-
-        return chunks
+# 字符级清洗映射：统一特殊空白，删除软连字符与零宽字符
+_CLEAN_TABLE = str.maketrans({
+    '\t': ' ', '\r': ' ', '\f': ' ', '\v': ' ',
+    '\xa0': ' ', '\u2009': ' ', '\u202f': ' ', '\u3000': ' ',
+    '\xad': None, '\u200b': None, '\ufeff': None,
+})
 
-    except Exception as e:
-        print(f"解析PDF失败 {pdf_path}: {str(e)}")
-        return []
+# 系统提示词：固定的分析要求只作为system消息发送，便于服务端缓存提示词前缀
+_CHUNK_SYSTEM_PROMPT = """作为计算机科学领域资深研究员，请基于用户提供的论文片段进行分析：
 
-def process_chunk(session, chunk: str, url: str, chunk_num: int, total_chunks: int) -> str:
-    """处理单个文本块"""
-    prompt = f"""作为计算机科学领域资深研究员，请基于以下论文片段进行分析（来源：{url}，当前分块进度：{chunk_num}/{total_chunks}）：
-                {chunk[:CHUNK_SIZE]}
-                
                 【第一步：章节定位】
                 请首先判断该片段所属的论文章节（如Abstract/Introduction/Methodology/Experiments/Conclusion等），判断依据包括：
                 1. 高频术语特征（如Method部分出现算法名、公式）
@@ -217,34 +118,13 @@ def process_chunk(session, chunk: str, url: str, chunk_num: int, total_chunks: i
                 3. 争议性观点需标注"需交叉验证"
                 """
 
-    try:
-        response = session.post(
-            url = API_URL,
-            json={
-                "model": MODEL_ID,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.4,
-                "max_tokens": 16384
-            },
-            headers={"Authorization": f"Bearer {API_KEY}"},
-            timeout = Timeout 
-        )
-        response.raise_for_status()
-
-        print(f"当前进度：{chunk_num}/{total_chunks}")
-
-        return response.json()["choices"][0]["message"]["content"]
-    except Exception as e:
-        print(f"分块处理失败: {str(e)}")
-        return ""
+_BATCH_SYSTEM_PROMPT = _CHUNK_SYSTEM_PROMPT + """
+                【批量分析】
+                用户会一次提供多个片段，每个片段以<chunk 序号>与</chunk 序号>标记。
+                对每个片段独立完成上述分析，并将该片段的完整分析同样包裹在<chunk 序号>与</chunk 序号>之间（序号与输入一致，不得遗漏或合并片段）。
+                """
 
-def generate_final_summary(session, chunks: List[str], url: str) -> str:
-    """生成最终汇总报告"""
-    summary_prompt = f"""作为领域专家，请基于以下分块分析结果合成论文综述报告（论文地址：{url}）：
-                        {'-'*40}
-                        分块分析结果：
-                        {'\n\n'.join(chunks)}
-                        {'-'*40}
+_SUMMARY_SYSTEM_PROMPT = """作为领域专家，请基于用户提供的分块分析结果合成论文综述报告：
                         
                         ## 综合报告结构要求
                         ### 1. 研究全景图
@@ -290,96 +170,492 @@ def generate_final_summary(session, chunks: List[str], url: str) -> str:
                         4. 争议性结论需标注"待验证假设"
                         """
 
+# 用户消息模板（仅URL、分块进度与分块内容随调用变化）
+_CHUNK_PROMPT_TPL = "来源：{url}\n当前分块进度：{chunk_num}/{total_chunks}\n---\n{chunk}"
+_BATCH_PROMPT_TPL = "来源：{url}\n全文共{total_chunks}块，本次提供{count}个片段\n---\n{chunks}"
+_SUMMARY_PROMPT_TPL = "论文地址：{url}\n----------------------------------------\n分块分析结果：\n{chunk_results}\n----------------------------------------"
+PDF_TEXT_FLAGS = pymupdf.TEXT_DEHYPHENATE | pymupdf.TEXT_MEDIABOX_CLIP  # 文本提取标志：合并行尾连字符、裁剪页面外文本
+
+# 模块级全局状态
+_chunk_cache = None  # 分块分析结果缓存连接（仅主进程的事件循环使用，首次用到时打开）
+
+
+class RequestLimiter:
+    """并发与速率双重限制：信号量控制在途请求数，令牌桶控制请求发起速率"""
+
+    def __init__(self, max_concurrency: int, rate: float, period: float = 1.0):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._capacity = max(rate, 1)
+        self._tokens = self._capacity
+        self._fill_rate = rate / period
+        self._updated = time.monotonic()
+
+    async def _take_token(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._fill_rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._fill_rate)
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            await self._take_token()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._semaphore.release()
+
+def setup_api_session(max_connections: int) -> aiohttp.ClientSession:
+    """配置调用模型API的异步会话（需在事件循环内创建）：复用长连接，响应压缩传输"""
+    connector = aiohttp.TCPConnector(
+        limit=max_connections,  # 与并发上限一致，每个在途请求独占一条可复用的连接
+        keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=300
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        # 流式响应不限制总时长，只要求连接建立与相邻数据帧的间隔不超时
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=Timeout, sock_read=Timeout),
+        headers={"Authorization": f"Bearer {API_KEY}", "Accept-Encoding": "gzip, deflate"}
+    )
+
+async def read_stream(response) -> str:
+    """逐帧读取SSE流式响应（data: {...}），拼接增量输出的正文；未收到结束帧视为传输中断"""
+    parts = []
+    async for line in response.content:
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            return "".join(parts)
+        choices = orjson.loads(data).get("choices")
+        if choices:
+            delta = choices[0].get("delta") or {}  # 结束帧可能只携带message与finish_reason
+            if delta.get("content"):
+                parts.append(delta["content"])
+            if choices[0].get("finish_reason"):
+                return "".join(parts)
+    raise aiohttp.ClientPayloadError("流式响应在结束帧之前中断")
+
+async def request_completion(session, limiter: RequestLimiter, system: str, prompt: str, temperature: float) -> str:
+    """流式调用模型API，网关错误、连接失败或流式传输中断时按指数回退重试"""
+    body = orjson.dumps({
+        "model": MODEL_ID,
+        "messages": [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+        "temperature": temperature,
+        "max_tokens": 16384,
+        "stream": True
+    })
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(min(BACKOFF_FACTOR * 2 ** (attempt - 1), BACKOFF_MAX))
+        try:
+            async with limiter, session.post(API_URL, data=body, headers={"Content-Type": "application/json"}) as response:
+                if response.status in RETRY_STATUS and attempt < MAX_RETRIES:
+                    continue
+                response.raise_for_status()
+                return await read_stream(response)
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError):
+            if attempt == MAX_RETRIES:
+                raise
+
+@lru_cache(maxsize=4096)
+def extract_arxiv_id(url: str) -> str:
+    """从arXiv URL提取论文ID（兼容版本号）"""
+    match = _RE_ARXIV_ID.search(url)
+    if not match:
+        raise ValueError(f"无效的arXiv链接: {url}")
+    return match.group(2).split('.pdf')[0]
+
+async def download_pdf(session, url: str, save_path: str) -> Optional[bytes]:
+    """异步下载PDF到内存（限频显示进度），开启CACHE_PDF时同时写入缓存路径"""
+    name = os.path.basename(save_path)
+    try:
+        async with session.get(url) as response:
+            response.raise_for_status()
+
+            total_size = response.content_length or 0
+            buffer = io.BytesIO()
+            last_print = time.monotonic()
+
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+                buffer.write(chunk)
+                # 多篇论文并发下载，进度逐行输出且限制频率，避免互相覆盖与频繁刷新终端
+                now = time.monotonic()
+                if SHOW_PROGRESS and total_size > 0 and now - last_print >= PROGRESS_INTERVAL:
+                    last_print = now
+                    print(f"{name} 下载进度: {buffer.tell() / total_size * 100:.1f}%")
+        data = buffer.getvalue()
+        print(f"{name} 下载完成（{len(data) / 1024:.0f} KB）")
+    except Exception as e:
+        print(f"下载失败 {url}: {str(e)}")
+        return None
+
+    if CACHE_PDF:
+        tmp_path = save_path + ".part"  # 写完后再改名，避免残缺文件被当作缓存
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, save_path)
+    return data
+
+def setup_download_session() -> aiohttp.ClientSession:
+    """配置下载PDF的异步会话（需在事件循环内创建），限制对arXiv的并发连接数"""
+    connector = aiohttp.TCPConnector(
+        limit_per_host=DOWNLOAD_CONCURRENCY,
+        keepalive_timeout=API_KEEPALIVE_TIMEOUT,  # 大文件之间保持与arXiv的长连接，避免重复TLS握手
+        ttl_dns_cache=300
+    )
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=Timeout, sock_read=Timeout)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+def _read_page(page) -> Tuple[str, bool]:
+    """对页面只做一次文本结构分析，同时取得纯文本（剔除上下标等小字号字符）与是否存在大字号大写标题"""
+    lines, large_spans = [], []
+    for block in page.get_text("dict", flags=PDF_TEXT_FLAGS)["blocks"]:
+        for line in block.get("lines", []):
+            spans = line["spans"]
+            text = "".join(span["text"] for span in spans if span["size"] > 8)
+            if text:
+                lines.append(text)
+            # 基于字体特征检测（直接读取各span的字号）
+            large_spans += [span["text"] for span in spans if span["size"] > 14]
+    large_text = "".join(large_spans).replace(" ", "")
+    return "\n".join(lines), len(large_text) > 5 and any(c.isupper() for c in large_text)
+
+def _is_section(has_large_title: bool, content: str) -> bool:
+    """增强章节检测逻辑：字体特征或内容模式命中其一即视为章节变化"""
+    return has_large_title or _RE_SECTION.search(content) is not None
+
+def _clean_repl(match) -> str:
+    """按 _RE_CLEAN 命中的分支返回替换文本"""
+    text, kind = match.group(), match.lastgroup
+    if kind == 'hyph':
+        return f"{text[0]}-{text[-1]}"  # 保留数字连字符
+    if kind == 'brkt':
+        # 修复括号粘连：删去紧贴括号的空白，其余空白按连续空白规则处理
+        rest = text[:-2]
+        return (' ' if len(rest) > 1 else rest) + text[-1]
+    if kind == 'ws':
+        return ' '
+    return text[0]  # 修复大写单词分割 / 字母数字粘连
+
+def _open_pdf(source: Union[str, bytes]):
+    """以MuPDF打开本地路径或内存中的PDF"""
+    if isinstance(source, bytes):
+        return pymupdf.open(stream=source, filetype="pdf")
+    return pymupdf.open(source)
+
+def _iter_pages(source: Union[str, bytes]) -> Iterator[Tuple[str, bool]]:
+    """逐页产出（纯文本, 是否存在大字号大写标题），优先使用MuPDF原生提取，跳过版面重建"""
     try:
-        response = session.post(
-            url = API_URL,
-            json={
-                "model": MODEL_ID,
-                "messages": [{"role": "user", "content": summary_prompt}],
-                "temperature": 0.2,
-                "max_tokens": 16384
-            },
-            headers={"Authorization": f"Bearer {API_KEY}"},
-            timeout = Timeout
+        doc = _open_pdf(source)
+    except pymupdf.FileDataError as e:
+        print(f"MuPDF无法解析该PDF（{str(e)}），回退至pdfplumber")
+        yield from _iter_pages_pdfplumber(source)
+        return
+
+    with doc:
+        for i in range(min(doc.page_count, MAX_PDF_PAGES)):
+            yield _read_page(doc[i])
+
+def _iter_pages_pdfplumber(source: Union[str, bytes]) -> Iterator[Tuple[str, bool]]:
+    """pdfplumber后备解析，输出格式与 _iter_pages 一致"""
+    with pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source) as pdf:
+        for page in pdf.pages[:MAX_PDF_PAGES]:
+            large_text = "".join(c["text"] for c in page.chars if c["size"] > 14).replace(" ", "")
+            text = page.filter(lambda obj: obj["object_type"] == "char" and obj["size"] > 8).extract_text()
+            has_large_title = len(large_text) > 5 and any(c.isupper() for c in large_text)
+            page.flush_cache()  # 释放该页的字符级缓存，内存占用不随页数增长
+            yield text or "", has_large_title
+
+def parse_pdf(source: Union[str, bytes], name: str) -> List[str]:
+    """解析进程任务：解析整篇PDF（本地路径或内存数据）并返回全部分块"""
+    return list(_extract_chunks(source, name))
+
+def _slice_text(text: str) -> Tuple[List[str], str]:
+    """线性切分文本：每块不超过CHUNK_SIZE，优先在窗口末段的句末处下刀，其次在空白处，返回完整分块与剩余文本"""
+    chunks, start = [], 0
+    while len(text) - start > CHUNK_SIZE:
+        end = start + CHUNK_SIZE
+        # 句子完整性保护：在[0.8, 1.0]×CHUNK_SIZE窗口内寻找最后一个句末标点
+        floor = start + int(CHUNK_SIZE * 0.8)
+        cut = max(text.rfind('. ', floor, end), text.rfind('! ', floor, end), text.rfind('? ', floor, end))
+        if cut != -1:
+            cut += 1  # 标点留在当前块，从其后的空白处切开
+        else:
+            cut = max(text.rfind(' ', start, end), text.rfind('\n', start, end))
+        if cut <= start:  # 整段没有空白（如长公式），只能硬切
+            chunks.append(text[start:end])
+            start = end
+        else:
+            chunks.append(text[start:cut])
+            start = cut + 1
+    return chunks, text[start:]
+
+def _extract_chunks(source: Union[str, bytes], name: str) -> Iterator[str]:
+    """逐页流式解析PDF并按块产出文本，解析状态不随页数增长"""
+    pending = ""  # 当前章节内尚未切出的文本（长度不超过CHUNK_SIZE加一页）
+    processed_hashes = deque(maxlen=DEDUPE_WINDOW)  # 最近页面的哈希，用于重复内容检测
+    budget = MAX_CHUNKS * CHUNK_SIZE  # 剩余字符预算，用尽后不再解析后续页面
+    
+    try:
+        for text, has_large_title in _iter_pages(source):
+            # 增强型文本清洗管道
+            clean_content = _RE_CLEAN.sub(_clean_repl, text.translate(_CLEAN_TABLE)).strip()
+            if not clean_content:
+                continue
+
+            # 新增重复内容检测
+            content_hash = blake2b(clean_content.encode('utf-8'), digest_size=8).digest()
+            if content_hash in processed_hashes:
+                continue
+            processed_hashes.append(content_hash)
+            budget -= len(clean_content)
+
+            # 增强章节检测
+            if _is_section(has_large_title, clean_content):
+                if pending:
+                    yield pending
+                    pending = ""
+                chunks, rest = _slice_text(clean_content)  # 章节标题独立分块
+                yield from chunks
+                if rest:
+                    yield rest
+            else:
+                # 智能分块逻辑：拼接同一章节的页面文本后按长度线性切分
+                pending = f"{pending} {clean_content}" if pending else clean_content
+                chunks, pending = _slice_text(pending)
+                yield from chunks
+
+            if budget <= 0:
+                print(f"{name} 已达到{MAX_CHUNKS}个分块的文本上限，不再解析后续页面")
+                break
+
+        # 输出末尾剩余文本
+        if pending:
+            yield pending
+
+    except Exception as e:
+        print(f"解析PDF失败 {name}: {str(e)}")
+    finally:
+        # 文档已关闭，主动回收解析产生的临时对象以缓解内存碎片
+        gc.collect()
+
+def get_chunk_cache() -> sqlite3.Connection:
+    """惰性打开分块分析结果缓存（单连接，由事件循环内的各论文任务共用；WAL模式便于同时运行的多个实例共享缓存）"""
+    global _chunk_cache
+    if _chunk_cache is None:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        _chunk_cache = sqlite3.connect(LLM_CACHE_PATH, timeout=30, isolation_level=None)
+        _chunk_cache.execute("PRAGMA journal_mode=WAL")
+        _chunk_cache.execute("CREATE TABLE IF NOT EXISTS chunk_cache (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        atexit.register(_chunk_cache.close)
+    return _chunk_cache
+
+def chunk_cache_key(chunk: str) -> str:
+    """分块缓存键：同一模型、同一版本提示词下内容相同的分块复用分析结果"""
+    return blake2b(f"{MODEL_ID}|{PROMPT_VERSION}|{chunk}".encode('utf-8'), digest_size=16).hexdigest()
+
+async def process_chunk(session, limiter: RequestLimiter, chunk: str, url: str, chunk_num: int, total_chunks: int) -> str:
+    """处理单个文本块（内容重复的分块直接返回缓存结果）"""
+    cache = get_chunk_cache()
+    key = chunk_cache_key(chunk)
+    cached = cache.execute("SELECT result FROM chunk_cache WHERE key = ?", (key,)).fetchone()
+    if cached:
+        print(f"当前进度：{chunk_num}/{total_chunks}（命中缓存）")
+        return cached[0]
+
+    prompt = _CHUNK_PROMPT_TPL.format(
+        url=url, chunk_num=chunk_num, total_chunks=total_chunks, chunk=chunk
+    )
+
+    try:
+        result = await request_completion(session, limiter, _CHUNK_SYSTEM_PROMPT, prompt, temperature=0.4)
+        if result:
+            cache.execute("INSERT OR REPLACE INTO chunk_cache (key, result) VALUES (?, ?)", (key, result))
+
+        print(f"当前进度：{chunk_num}/{total_chunks}")
+
+        return result
+    except Exception as e:
+        print(f"分块处理失败: {str(e)}")
+        return ""
+
+async def process_batch(session, limiter: RequestLimiter, batch: List[Tuple[int, str]], url: str,
+                        total_chunks: int) -> Dict[int, str]:
+    """将多个分块合并为一次请求分析，按<chunk 序号>标记拆分结果，结果缺失的分块再逐块请求"""
+    results = {}
+    if len(batch) > 1:
+        prompt = _BATCH_PROMPT_TPL.format(
+            url=url, count=len(batch), total_chunks=total_chunks,
+            chunks="\n".join(f"<chunk {num}>\n{chunk}\n</chunk {num}>" for num, chunk in batch)
         )
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+        try:
+            reply = await request_completion(session, limiter, _BATCH_SYSTEM_PROMPT, prompt, temperature=0.4)
+            found = dict(_RE_BATCH_ITEM.findall(reply))
+        except Exception as e:
+            print(f"批量分块处理失败: {str(e)}，改为逐块请求")
+            found = {}
+
+        cache = get_chunk_cache()
+        for num, chunk in batch:
+            result = found.get(str(num), "").strip()
+            if result:
+                cache.execute("INSERT OR REPLACE INTO chunk_cache (key, result) VALUES (?, ?)", (chunk_cache_key(chunk), result))
+                results[num] = result
+                print(f"当前进度：{num}/{total_chunks}")
+
+    missing = [(num, chunk) for num, chunk in batch if num not in results]
+    singles = await asyncio.gather(*(
+        process_chunk(session, limiter, chunk, url, num, total_chunks) for num, chunk in missing
+    ))
+    results.update(zip((num for num, _ in missing), singles))
+    return results
+
+async def analyse_chunks(session, limiter: RequestLimiter, chunks: List[str], url: str) -> List[str]:
+    """分析全部分块：命中缓存的直接复用，其余每BATCH_CHUNKS块合并为一次请求并发处理"""
+    cache = get_chunk_cache()
+    total_chunks = len(chunks)
+    results, pending = {}, []
+    for num, chunk in enumerate(chunks, 1):
+        cached = cache.execute("SELECT result FROM chunk_cache WHERE key = ?", (chunk_cache_key(chunk),)).fetchone()
+        if cached:
+            print(f"当前进度：{num}/{total_chunks}（命中缓存）")
+            results[num] = cached[0]
+        else:
+            pending.append((num, chunk))
+
+    batches = [pending[i:i + BATCH_CHUNKS] for i in range(0, len(pending), BATCH_CHUNKS)]
+    for batch_results in await asyncio.gather(*(
+        process_batch(session, limiter, batch, url, total_chunks) for batch in batches
+    )):
+        results.update(batch_results)
+    return [results[num] for num in range(1, total_chunks + 1)]
+
+async def generate_final_summary(session, limiter: RequestLimiter, chunks: List[str], url: str) -> str:
+    """生成最终汇总报告（分块结果足够短时直接拼接，省去一次模型调用）"""
+    chunks = [c for c in chunks if c]  # 分析失败的分块结果为空，不计入汇总
+    if not chunks:
+        print("汇总失败: 所有分块分析均失败")
+        return "生成完整摘要失败，请查看分块分析结果"
+    joined = "\n\n".join(chunks)
+    if len(chunks) == 1 or len(joined) < CHUNK_SIZE:
+        print("分块分析结果较短，直接作为全文分析结果")
+        return joined
+    summary_prompt = _SUMMARY_PROMPT_TPL.format(url=url, chunk_results=joined)
+
+    try:
+        return await request_completion(session, limiter, _SUMMARY_SYSTEM_PROMPT, summary_prompt, temperature=0.2)
     except Exception as e:
         print(f"汇总失败: {str(e)}")
         return "生成完整摘要失败，请查看分块分析结果"
 
-def process_paper(session, filename: str, url: str, result_dir: str):
-    """处理单篇论文"""
+async def process_paper(session, limiter: RequestLimiter, download_session, pdf_pool: ProcessPoolExecutor,
+                        filename: str, url: str, part_dir: str, sum_dir: str):
+    """处理单篇论文（本地无缓存时下载PDF，解析交给进程池以免阻塞事件循环）"""
     try:
-        # 下载PDF
+        # 在任何网络请求之前校验链接，输入文件内容有误时直接跳过
+        try:
+            parsed = urlparse(url)
+            valid = parsed.scheme in ("http", "https") and parsed.hostname in ARXIV_HOSTS
+        except ValueError:  # 如 "http://[oops" 这类无法解析的链接
+            valid = False
+        if not valid:
+            print(f"非arXiv论文链接，跳过: {filename} ({url})")
+            return
+
         arxiv_id = extract_arxiv_id(url)
         pdf_path = os.path.join(PDF_DIR, f"{arxiv_id}.pdf")
-        
-        if not os.path.exists(pdf_path) and not download_pdf(f"https://arxiv.org/pdf/{arxiv_id}.pdf", pdf_path):
-            return
+
+        if os.path.exists(pdf_path):
+            source = pdf_path
+        else:
+            source = await download_pdf(download_session, f"https://arxiv.org/pdf/{arxiv_id}.pdf", pdf_path)
+            if source is None:
+                print(f"未获取到PDF文件，跳过: {url}")
+                return
 
         # 分块处理
-        text_chunks = extract_pdf_text(pdf_path)
+        # 提示词需要总块数，故由解析进程返回全部分块文本（解析过程本身为逐页流式）
+        text_chunks = await asyncio.get_running_loop().run_in_executor(pdf_pool, parse_pdf, source, arxiv_id)
         if not text_chunks:
             print("未提取到有效文本")
             return
         else:
             print("已成功预处理目标论文块，即将调用模型进行处理，该过程与远端api响应速度相关，请稍等")
 
-        # 处理分块
-        chunk_results = []
-        for idx, chunk in enumerate(text_chunks, 1):
-            result = process_chunk(session, chunk, url, idx, len(text_chunks))
-            chunk_results.append(result)
-            # print(chunk+"\n\n")
-            time.sleep(1)  # 请求间隔
+        # 分批并发处理分块（由限流器控制并发数与请求速率）
+        chunk_results = await analyse_chunks(session, limiter, text_chunks, url)
 
         # 生成汇总
         print("正在进入全文汇总阶段，请稍后")
-        final_summary = generate_final_summary(session, chunk_results, url)
+        final_summary = await generate_final_summary(session, limiter, chunk_results, url)
 
         # 保存结果
         md_filename = os.path.splitext(filename)[0] + ".md"
-        output_part_path = os.path.join(result_dir, os.path.basename("/part"))
-        os.makedirs(output_part_path, exist_ok=True)
-        output_part_path = os.path.join(output_part_path, os.path.basename(md_filename))
-
-        output_sum_path = os.path.join(result_dir, os.path.basename("/sum"))
-        os.makedirs(output_sum_path, exist_ok=True)
-        output_sum_path = os.path.join(output_sum_path, os.path.basename(md_filename))
+        output_part_path = os.path.join(part_dir, md_filename)
+        output_sum_path = os.path.join(sum_dir, md_filename)
         
-        #保存分块结果
+        #保存分块结果（在内存中拼接完整报告后一次写入）
+        source_info = f"## 原文信息\n- 地址: [{url}]({url})\n"
+        part_report = ["# 论文分块分析报告\n\n", source_info, "## 分块分析\n"]
+        part_report += [f"\n### 片段 {i}\n{res}\n" for i, res in enumerate(chunk_results, 1)]
         with open(output_part_path, "w", encoding="utf-8") as f:
-            f.write(f"# 论文分块分析报告\n\n")
-            f.write(f"## 原文信息\n- 地址: [{url}]({url})\n")
-            f.write(f"## 分块分析\n")
-            for i, res in enumerate(chunk_results, 1):
-                f.write(f"\n### 片段 {i}\n{res}\n")
+            f.write("".join(part_report))
         
         #保存全文结果
         with open(output_sum_path, "w", encoding="utf-8") as f:
-            f.write(f"# 论文全文分析报告\n\n")
-            f.write(f"## 原文信息\n- 地址: [{url}]({url})\n")
-            f.write(f"\n## \n{final_summary}")
+            f.write(f"# 论文全文分析报告\n\n{source_info}\n## \n{final_summary}")
             
         print(f"成功保存分块处理结果至{output_part_path}\n成功保存全文分析结果至{output_sum_path}")
 
     except Exception as e:
         print(f"处理失败: {str(e)}")
 
-if __name__ == "__main__":    
+async def process_all(papers: List[Tuple[str, str]], part_dir: str, sum_dir: str):
+    """在同一事件循环中并发处理全部论文：下载、解析与模型调用相互重叠"""
+    paper_slots = asyncio.Semaphore(PAPER_CONCURRENCY)
+    limiter = RequestLimiter(MAX_CONCURRENCY, RATE_LIMIT)
+
+    async def run(idx: int, filename: str, url: str):
+        async with paper_slots:
+            print(f"\n即将处理第{idx}/{len(papers)}篇目标论文: {filename}")
+            await process_paper(session, limiter, download_session, pdf_pool, filename, url, part_dir, sum_dir)
+
+    # 同一时刻最多PAPER_CONCURRENCY篇论文在解析，进程数无需超过该值
+    workers = max(1, min(MAX_WORKERS, PAPER_CONCURRENCY, len(papers)))
+    with ProcessPoolExecutor(max_workers=workers) as pdf_pool:
+        async with setup_api_session(MAX_CONCURRENCY) as session, setup_download_session() as download_session:
+            await asyncio.gather(*(run(idx, filename, url) for idx, (filename, url) in enumerate(papers, 1)))
+
+def main():
     # 初始化环境
     os.makedirs(PDF_DIR, exist_ok=True)
     result_dir = os.path.join(RESULT_DIR, os.path.basename(Path.rstrip("/\\")))
-    os.makedirs(result_dir, exist_ok=True)
-
-    # 创建会话
-    session = setup_requests_session()
-
-    # 处理文件
-    files = [f for f in os.listdir(Path) if f.endswith(".txt")]
-    for idx, filename in enumerate(files, 1):
-        print(f"\n即将处理第{idx}/{len(files)}篇目标论文: {filename}")  
-        with open(os.path.join(Path, filename), "r", encoding="utf-8") as f:
-            url = f.readline().strip()
-            process_paper(session, filename, url, result_dir)
\ No newline at end of file
+    part_dir = os.path.join(result_dir, "part")  # 分块分析结果目录
+    sum_dir = os.path.join(result_dir, "sum")  # 全文分析结果目录
+    os.makedirs(part_dir, exist_ok=True)
+    os.makedirs(sum_dir, exist_ok=True)
+
+    # 读取论文链接
+    with os.scandir(Path) as it:
+        entries = [e for e in it if e.name.endswith(".txt") and e.is_file()]
+    papers = []
+    for entry in entries:
+        with open(entry.path, "r", encoding="utf-8") as f:
+            papers.append((entry.name, f.readline().strip()))
+
+    # 各论文相互独立，在同一事件循环中并发处理（PDF解析为CPU密集型，交给进程池）
+    asyncio.run(process_all(papers, part_dir, sum_dir))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
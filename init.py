@@ -6,23 +6,32 @@ class Config:
     def __init__(self):
         # 系统路径配置
         self.PDF_DIR = "./pdfs"  # PDF文件保存目录
+        self.CACHE_PDF = False  # 是否将下载的PDF写入PDF_DIR缓存（默认仅在内存中解析）
         self.RESULT_DIR = "./result"  # 分析结果保存目录
         self.SEARCH_DIR = "./res"  # 论文检索结果保存目录
         self.Path = "./default"   #输入目录默认路径（包含论文链接文件）
         self.TIMEOUT = 120   #超时时间为120
+        self.MAX_WORKERS = os.cpu_count() or 1   #并行解析PDF的最大进程数
 
         # 论文检索配置
         self.LOAD_MAX_DOCS = 100   #最大检索量
         self.DEFAULT_KEYWORD = "TTA"  # 默认检索关键词
         self.DEFAULT_SEARCH_COUNT = 10  # 默认检索返回论文数量
+        self.SEARCH_CACHE_TTL = 86400  # 检索结果本地缓存有效期（秒），arXiv每日更新一次
 
         # 网络请求配置
         self.MAX_RETRIES = 10  # 最大重试次数
         self.BACKOFF_FACTOR = 2  # 重试时的时间回退系数
+        self.MAX_CONCURRENCY = 8  # 模型API最大并发请求数
+        self.RATE_LIMIT = 1  # 每秒最多发起的模型API请求数
+        self.BATCH_CHUNKS = 4  # 合并为一次模型请求的分块数（设为1即逐块请求）
+        self.DOWNLOAD_CONCURRENCY = 4  # 对arXiv的最大并发下载连接数
+        self.PAPER_CONCURRENCY = 4  # 同时处理（下载、解析并调用模型）的论文数
 
         # PDF 解析配置
         self.MAX_PDF_PAGES = 25  # 提取文本的最大页数
         self.CHUNK_SIZE = 10000  # 文本分块长度
+        self.MAX_CHUNKS = 12  # 每篇论文最多解析的文本量（按分块数计），达到后不再解析后续页面
 
         # API 配置
         self.API_KEY = ""  # API 密钥